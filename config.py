@@ -3,10 +3,29 @@
 import os
 from typing import Optional
 
+# Largest number of visitors the bulk endpoint accepts in one request
+MAX_BULK_SIZE = 1000
+
 
 class Config:
     """Configuration class for the ShowAds data connector."""
 
+    def __init__(self):
+        """Resolve configuration values from the environment once."""
+        self._showads_api_url = self.get_showads_api_url()
+        self._project_key = self.get_project_key()
+        self._min_age = self.get_min_age()
+        self._max_age = self.get_max_age()
+        self._batch_size = self.get_batch_size()
+        self._max_retries = self.get_max_retries()
+        self._retry_delay = self.get_retry_delay()
+        self._concurrency = self.get_concurrency()
+        self._validation_workers = self.get_validation_workers()
+        self._parquet_cache = self.get_parquet_cache()
+        self._compress_requests = self.get_compress_requests()
+        self._log_level = self.get_log_level()
+        self._validated = False
+
     @staticmethod
     def get_showads_api_url() -> str:
         return os.getenv('SHOWADS_API_URL', 'https://golang-assignment-968918017632.europe-west3.run.app')
@@ -35,55 +54,99 @@ class Config:
     def get_retry_delay() -> int:
         return int(os.getenv('RETRY_DELAY', '1'))
 
+    @staticmethod
+    def get_concurrency() -> int:
+        return int(os.getenv('CONCURRENCY', '8'))
+
+    @staticmethod
+    def get_validation_workers() -> int:
+        return int(os.getenv('VALIDATION_WORKERS', '1'))
+
+    @staticmethod
+    def get_parquet_cache() -> bool:
+        return os.getenv('PARQUET_CACHE', 'false').lower() in ('1', 'true', 'yes')
+
+    @staticmethod
+    def get_compress_requests() -> bool:
+        return os.getenv('COMPRESS_REQUESTS', 'false').lower() in ('1', 'true', 'yes')
+
     @staticmethod
     def get_log_level() -> str:
         return os.getenv('LOG_LEVEL', 'INFO')
 
     @property
     def SHOWADS_API_URL(self) -> str:
-        return self.get_showads_api_url()
+        return self._showads_api_url
 
     @property
     def PROJECT_KEY(self) -> str:
-        return self.get_project_key()
+        return self._project_key
 
     @property
     def MIN_AGE(self) -> int:
-        return self.get_min_age()
+        return self._min_age
 
     @property
     def MAX_AGE(self) -> int:
-        return self.get_max_age()
+        return self._max_age
 
     @property
     def BATCH_SIZE(self) -> int:
-        return self.get_batch_size()
+        return self._batch_size
 
     @property
     def MAX_RETRIES(self) -> int:
-        return self.get_max_retries()
+        return self._max_retries
 
     @property
     def RETRY_DELAY(self) -> int:
-        return self.get_retry_delay()
+        return self._retry_delay
+
+    @property
+    def CONCURRENCY(self) -> int:
+        return self._concurrency
+
+    @property
+    def VALIDATION_WORKERS(self) -> int:
+        return self._validation_workers
+
+    @property
+    def PARQUET_CACHE(self) -> bool:
+        return self._parquet_cache
+
+    @property
+    def COMPRESS_REQUESTS(self) -> bool:
+        return self._compress_requests
 
     @property
     def LOG_LEVEL(self) -> str:
-        return self.get_log_level()
+        return self._log_level
 
     def validate(self) -> None:
         """Validate configuration values. So there is no non-sense values."""
+        # Values are fixed at construction, so one successful check holds for the instance's lifetime
+        if self._validated:
+            return
+
         if self.MIN_AGE < 0 or self.MIN_AGE > 150:
             raise ValueError(f"Invalid MIN_AGE: {self.MIN_AGE}")
 
         if self.MAX_AGE < self.MIN_AGE or self.MAX_AGE > 150:
             raise ValueError(f"Invalid MAX_AGE: {self.MAX_AGE}")
 
-        if self.BATCH_SIZE <= 0 or self.BATCH_SIZE > 1000:
+        if self.BATCH_SIZE <= 0 or self.BATCH_SIZE > MAX_BULK_SIZE:
             raise ValueError(f"Invalid BATCH_SIZE: {self.BATCH_SIZE}")
 
+        if self.CONCURRENCY <= 0 or self.CONCURRENCY > 32:
+            raise ValueError(f"Invalid CONCURRENCY: {self.CONCURRENCY}")
+
+        if self.VALIDATION_WORKERS <= 0:
+            raise ValueError(f"Invalid VALIDATION_WORKERS: {self.VALIDATION_WORKERS}")
+
         if not self.SHOWADS_API_URL:
             raise ValueError("SHOWADS_API_URL is required")
 
         if not self.PROJECT_KEY:
             raise ValueError("PROJECT_KEY is required")
+
+        self._validated = True
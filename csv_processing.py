@@ -1,15 +1,48 @@
 """CSV processor for customer data validation and processing."""
 
 import logging
-from typing import Generator, List, Tuple
+import multiprocessing
+import os
+from collections import deque
+from concurrent.futures import Future, ProcessPoolExecutor
+from typing import Any, Dict, Generator, List, Mapping, Optional, Tuple
+import numpy as np
 import pandas as pd
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.csv as pacsv
+import pyarrow.parquet as pq
 from pydantic import ValidationError
 
-from config import Config
-from models import Customer, BannerRequest
+from config import MAX_BULK_SIZE, Config
+from models import NAME_PATTERN, BannerBatch, Customer
 
 logger = logging.getLogger(__name__)
 
+# Patterns are kept RE2-compatible so Arrow-backed columns match them in C++
+UUID_PATTERN = r'^[0-9a-fA-F]{8}-[0-9a-fA-F]{4}-[0-9a-fA-F]{4}-[0-9a-fA-F]{4}-[0-9a-fA-F]{12}$'
+
+CSV_COLUMNS = ['Name', 'Age', 'Cookie', 'Banner_id']
+# Every column is read as a string and integer columns are parsed afterwards,
+# so a malformed Age or Banner_id becomes <NA> and invalidates its row instead
+# of failing the read.
+CSV_COLUMN_TYPES = {column: pa.string() for column in CSV_COLUMNS}
+# Narrowest types that hold every valid value (Age up to 150, Banner_id up to 99)
+INTEGER_COLUMN_TYPES = {'Age': pa.uint8(), 'Banner_id': pa.int16()}
+INTEGER_PATTERN = r'^\s*\d{1,9}\s*$'
+CSV_BLOCK_SIZE = 8 << 20
+# Rows validated per pass; validation costs mostly per call, so chunks are validated
+# large and only then sliced into API-sized batches
+VALIDATION_CHUNK_SIZE = 100_000
+# Side files hold already parsed columns, so reruns skip CSV tokenization and integer parsing
+PARQUET_SUFFIX = '.parquet'
+PARQUET_SCHEMA = pa.schema([(column, INTEGER_COLUMN_TYPES.get(column, pa.string())) for column in CSV_COLUMNS])
+ARROW_PANDAS_DTYPES = {
+    pa.string(): pd.StringDtype('pyarrow'),
+    pa.uint8(): pd.UInt8Dtype(),
+    pa.int16(): pd.Int16Dtype(),
+}
+
 
 class CSVProcessor:
     """Processes CSV files and validates customer data."""
@@ -17,8 +50,15 @@ class CSVProcessor:
     def __init__(self, config: Config):
         """Initialize the CSV processor."""
         self.config = config
+        self._min_age = config.MIN_AGE
+        self._max_age = config.MAX_AGE
+        self._validation_workers = config.VALIDATION_WORKERS
+        self._parquet_cache = config.PARQUET_CACHE
+        # Each batch is sent as one bulk request, so batches must respect the API limit
+        self._batch_size = min(config.BATCH_SIZE, MAX_BULK_SIZE)
         self.valid_customers: List[Customer] = []
         self.invalid_count = 0
+        self.duplicate_count = 0
         self.total_count = 0
 
     def read_csv_in_chunks(self, file_path: str, chunk_size: int = 10000) -> Generator[pd.DataFrame, None, None]:
@@ -26,78 +66,236 @@ class CSVProcessor:
         try:
             logger.info(f"Starting to read CSV file: {file_path}")
 
-            # Read the CSV in chunks to handle large files
-            chunk_reader = pd.read_csv(file_path, chunksize=chunk_size)
+            parquet_path = self.ensure_parquet(file_path) if self._parquet_cache else None
+            if parquet_path:
+                logger.info(f"Reading cached Parquet file: {parquet_path}")
+                batches = pq.ParquetFile(parquet_path).iter_batches(batch_size=chunk_size, columns=CSV_COLUMNS)
+            else:
+                batches = (self._parse_integer_columns(batch) for batch in self._open_csv(file_path))
 
-            for chunk_num, chunk in enumerate(chunk_reader):
-                logger.debug(f"Processing chunk {chunk_num + 1} with {len(chunk)} rows")
-                yield chunk
+            chunk_num = 0
+            for batch in batches:
+                for offset in range(0, batch.num_rows, chunk_size):
+                    chunk = batch.slice(offset, chunk_size).to_pandas(types_mapper=self._arrow_types_mapper)
+                    chunk_num += 1
+                    logger.debug(f"Processing chunk {chunk_num} with {len(chunk)} rows")
+                    yield chunk
 
         except FileNotFoundError:
             logger.error(f"CSV file not found: {file_path}")
             raise
-        except pd.errors.EmptyDataError:
-            logger.error(f"CSV file is empty: {file_path}")
+        except pa.ArrowInvalid as e:
+            logger.error(f"Invalid or empty CSV file {file_path}: {str(e)}")
             raise
         except Exception as e:
             logger.error(f"Error reading CSV file {file_path}: {str(e)}")
             raise
 
-    def validate_customer_row(self, row: pd.Series) -> Tuple[Customer, bool]:
-        """Validate a single customer row and return the customer object and validity status."""
+    @staticmethod
+    def _open_csv(file_path: str) -> pacsv.CSVStreamingReader:
+        """Stream the CSV as Arrow record batches to handle large files."""
+        return pacsv.open_csv(
+            file_path,
+            read_options=pacsv.ReadOptions(block_size=CSV_BLOCK_SIZE, use_threads=True),
+            convert_options=pacsv.ConvertOptions(
+                include_columns=CSV_COLUMNS,
+                column_types=CSV_COLUMN_TYPES
+            )
+        )
+
+    def ensure_parquet(self, file_path: str) -> Optional[str]:
+        """Convert the CSV to a Parquet side file unless an up-to-date one exists and return its path.
+
+        Returns None when the side file cannot be written, e.g. on a read-only mount.
+        """
+        parquet_path = file_path + PARQUET_SUFFIX
+        temp_path = parquet_path + '.tmp'
+
         try:
-            # Convert row to dict and create Customer object
-            customer_data = {
-                'Name': str(row.get('Name', '')),
-                'Age': int(row.get('Age', 0)),
-                'Cookie': str(row.get('Cookie', '')),
-                'Banner_id': int(row.get('Banner_id', -1))
-            }
+            if os.path.exists(parquet_path) and os.path.getmtime(parquet_path) >= os.path.getmtime(file_path):
+                return parquet_path
+
+            logger.info(f"Converting CSV file to Parquet: {parquet_path}")
+            with pq.ParquetWriter(temp_path, PARQUET_SCHEMA) as writer:
+                for batch in self._open_csv(file_path):
+                    writer.write_batch(self._parse_integer_columns(batch))
+            # Readers never see a partially written side file
+            os.replace(temp_path, parquet_path)
+            return parquet_path
+
+        except OSError as e:
+            logger.warning(f"Cannot use Parquet cache for {file_path}: {str(e)}")
+            return None
+        finally:
+            if os.path.exists(temp_path):
+                os.remove(temp_path)
+
+    @staticmethod
+    def _parse_integer_columns(batch: pa.RecordBatch) -> pa.RecordBatch:
+        """Parse integer columns into narrow types with Arrow compute kernels, turning malformed values into nulls."""
+        columns = []
+        for name, column in zip(batch.schema.names, batch.columns):
+            arrow_type = INTEGER_COLUMN_TYPES.get(name)
+            if arrow_type is not None:
+                is_integer = pc.match_substring_regex(column, INTEGER_PATTERN)
+                digits = pc.if_else(is_integer, pc.utf8_trim_whitespace(column), pa.scalar(None, pa.string()))
+                values = pc.cast(digits, pa.int32())
+                # Values too large for the narrow type are out of every valid range anyway
+                fits = pc.less_equal(values, np.iinfo(arrow_type.to_pandas_dtype()).max)
+                column = pc.cast(pc.if_else(fits, values, pa.scalar(None, pa.int32())), arrow_type)
+            columns.append(column)
 
-            # Create customer object (this validates Name, Cookie, and Banner_id)
-            customer = Customer(**customer_data)
+        return pa.RecordBatch.from_arrays(columns, names=batch.schema.names)
 
-            # Validate age against configurable limits
-            customer.validate_age(self.config.MIN_AGE, self.config.MAX_AGE)
+    @staticmethod
+    def _arrow_types_mapper(arrow_type: pa.DataType):
+        """Map Arrow columns to Arrow-backed strings and nullable integers so no values fall back to objects."""
+        return ARROW_PANDAS_DTYPES.get(arrow_type)
 
+    def validate_customer_row(self, row: Mapping[str, Any]) -> Tuple[Customer, bool]:
+        """Validate a single customer row and return the customer object and validity status.
+
+        The row may be any mapping, such as a dict or a pandas Series. Its values are checked as
+        text, as if read from a CSV file, so Age and Banner_id must be written as whole numbers
+        and missing values stay missing. The row is validated as a one-row chunk, so single rows
+        and whole chunks share the same rules.
+        """
+        try:
+            # Arrow-backed strings, as in CSV chunks, so the patterns match the same way in both paths
+            frame = pd.DataFrame([{column: row.get(column) for column in CSV_COLUMNS}])
+            frame = frame.astype(ARROW_PANDAS_DTYPES[pa.string()])
+            _, invalid, failures, _ = self._validate_chunk(frame, self._min_age, self._max_age)
+
+            if invalid:
+                failed = ', '.join(field for field, count in failures.items() if count)
+                raise ValueError(f"Failed validation of {failed}")
+
+            customer = Customer(
+                Name=str(row['Name']),
+                Age=int(row['Age']),
+                Cookie=str(row['Cookie']),
+                Banner_id=int(row['Banner_id'])
+            )
             return customer, True
 
-        except (ValidationError, ValueError, TypeError) as e:
-            # Log the specific validation error with row data
-            row_info = f"Name: {row.get('Name', 'N/A')}, Age: {row.get('Age', 'N/A')}, " \
-                       f"Cookie: {row.get('Cookie', 'N/A')}, Banner_id: {row.get('Banner_id', 'N/A')}"
-            logger.warning(f"Invalid customer data - {row_info} - Error: {str(e)}")
+        except (ValidationError, ValueError, TypeError, AttributeError) as e:
+            # Log the specific validation error with row data, formatted only if the record is emitted
+            if logger.isEnabledFor(logging.WARNING):
+                logger.warning("Invalid customer data - Name: %s, Age: %s, Cookie: %s, Banner_id: %s - Error: %s",
+                               row.get('Name', 'N/A'), row.get('Age', 'N/A'),
+                               row.get('Cookie', 'N/A'), row.get('Banner_id', 'N/A'), e)
             return None, False
 
-    def process_csv_chunk(self, chunk: pd.DataFrame) -> List[Customer]:
-        """Process a chunk of CSV data and return valid customers."""
-        valid_customers = []
+    @staticmethod
+    def _validate_chunk(chunk: pd.DataFrame, min_age: int,
+                        max_age: int) -> Tuple[BannerBatch, int, Dict[str, int], int]:
+        """Validate a chunk column-wise.
 
-        for index, row in chunk.iterrows():
-            self.total_count += 1
-            customer, is_valid = self.validate_customer_row(row)
+        Returns its banner requests, the invalid row count, the number of rows failing each
+        field's rule and the duplicate row count. Kept static so it can be pickled and run in
+        a worker process.
+        """
+        names = chunk['Name'].str.strip()
+        cookies = chunk['Cookie']
+        age = CSVProcessor._integer_values(chunk['Age'])
+        banner_id = CSVProcessor._integer_values(chunk['Banner_id'])
 
-            if is_valid and customer:
-                valid_customers.append(customer)
-            else:
-                self.invalid_count += 1
+        # One boolean mask per rule, evaluated over whole columns
+        checks = {
+            'Name': names.str.match(NAME_PATTERN, na=False),
+            'Age': age.between(min_age, max_age),
+            'Cookie': cookies.str.match(UUID_PATTERN, na=False),
+            'Banner_id': banner_id.between(0, 99),
+        }
+        # Nullable columns propagate <NA> through the comparisons
+        checks = {field: check.fillna(False).astype(bool) for field, check in checks.items()}
+        mask = checks['Name'] & checks['Age'] & checks['Cookie'] & checks['Banner_id']
+        failures = {field: int((~check).sum()) for field, check in checks.items()}
+
+        valid = pd.DataFrame({'VisitorCookie': cookies[mask], 'BannerId': banner_id[mask].astype(np.int16)})
+        # A repeated (cookie, banner) pair would only resend the same banner request
+        unique = valid.drop_duplicates()
+
+        banner_batch = BannerBatch(
+            unique['VisitorCookie'].to_numpy(dtype=object),
+            unique['BannerId'].to_numpy(dtype=np.int16)
+        )
+        return banner_batch, int((~mask).sum()), failures, len(valid) - len(unique)
 
-        return valid_customers
+    @staticmethod
+    def _integer_values(column: pd.Series) -> pd.Series:
+        """Parse an integer column, leaving <NA> wherever the CSV reader would not read an integer."""
+        # Columns parsed by the reader are already integers
+        if pd.api.types.is_integer_dtype(column.dtype):
+            return column
 
-    def process_csv_file(self, file_path: str) -> Generator[List[Customer], None, None]:
-        """Process entire CSV file and yield batches of valid customers."""
+        text = column.astype(ARROW_PANDAS_DTYPES[pa.string()])
+        return pd.to_numeric(text.where(text.str.match(INTEGER_PATTERN, na=False)), errors='coerce')
+
+    def _record_chunk(self, row_count: int, invalid: int, failures: Dict[str, int], duplicates: int) -> None:
+        """Add a validated chunk to the processing statistics."""
+        self.total_count += row_count
+        self.invalid_count += invalid
+        self.duplicate_count += duplicates
+
+        if invalid:
+            # One summary per chunk instead of a line per invalid row
+            summary = ', '.join(f"{field}: {count}" for field, count in failures.items() if count)
+            logger.warning(f"Skipped {invalid} invalid records out of {row_count} in chunk ({summary})")
+        if duplicates:
+            logger.debug(f"Dropped {duplicates} duplicate banner requests in chunk")
+
+    def process_csv_chunk(self, chunk: pd.DataFrame) -> BannerBatch:
+        """Validate a chunk of CSV data column-wise and return banner requests for the valid rows."""
+        banner_requests, invalid, failures, duplicates = self._validate_chunk(chunk, self._min_age, self._max_age)
+        self._record_chunk(len(chunk), invalid, failures, duplicates)
+        return banner_requests
+
+    def _process_chunks_in_pool(self, file_path: str) -> Generator[BannerBatch, None, None]:
+        """Validate chunks in worker processes and yield their banner requests in file order."""
+        # Spawned workers do not inherit the reader's Arrow threads
+        context = multiprocessing.get_context('spawn')
+
+        with ProcessPoolExecutor(max_workers=self._validation_workers, mp_context=context) as executor:
+            pending: deque = deque()
+
+            for chunk in self.read_csv_in_chunks(file_path, VALIDATION_CHUNK_SIZE):
+                # Bound the queued chunks so the file is not read ahead into memory
+                if len(pending) >= 2 * self._validation_workers:
+                    yield self._collect_chunk(*pending.popleft())
+
+                future = executor.submit(self._validate_chunk, chunk, self._min_age, self._max_age)
+                pending.append((future, len(chunk)))
+
+            while pending:
+                yield self._collect_chunk(*pending.popleft())
+
+    def _collect_chunk(self, future: Future, row_count: int) -> BannerBatch:
+        """Wait for a chunk validated in a worker process and record its statistics."""
+        banner_requests, invalid, failures, duplicates = future.result()
+        self._record_chunk(row_count, invalid, failures, duplicates)
+        return banner_requests
+
+    def process_csv_file(self, file_path: str) -> Generator[BannerBatch, None, None]:
+        """Process entire CSV file and yield batches of banner requests."""
         logger.info(f"Starting CSV processing for file: {file_path}")
 
         self.total_count = 0
         self.invalid_count = 0
+        self.duplicate_count = 0
 
         try:
-            for chunk in self.read_csv_in_chunks(file_path):
-                valid_customers = self.process_csv_chunk(chunk)
+            if self._validation_workers > 1:
+                validated_chunks = self._process_chunks_in_pool(file_path)
+            else:
+                validated_chunks = (
+                    self.process_csv_chunk(chunk) for chunk in self.read_csv_in_chunks(file_path, VALIDATION_CHUNK_SIZE)
+                )
 
-                if valid_customers:
-                    logger.debug(f"Processed chunk: {len(valid_customers)} valid customers")
-                    yield valid_customers
+            for banner_requests in validated_chunks:
+                logger.debug(f"Processed chunk: {len(banner_requests)} valid customers")
+                for offset in range(0, len(banner_requests), self._batch_size):
+                    yield banner_requests[offset:offset + self._batch_size]
 
             # Log final statistics
             valid_count = self.total_count - self.invalid_count
@@ -112,25 +310,13 @@ class CSVProcessor:
             logger.error(f"Error processing CSV file: {str(e)}")
             raise
 
-    def customers_to_banner_requests(self, customers: List[Customer]) -> List[BannerRequest]:
-        """Convert list of customers to banner requests."""
-        banner_requests = []
-
-        for customer in customers:
-            banner_request = BannerRequest(
-                VisitorCookie=customer.Cookie,
-                BannerId=customer.Banner_id
-            )
-            banner_requests.append(banner_request)
-
-        return banner_requests
-
     def get_statistics(self) -> dict:
         """Get processing statistics."""
         return {
             'total_records': self.total_count,
             'valid_records': self.total_count - self.invalid_count,
             'invalid_records': self.invalid_count,
+            'duplicate_records': self.duplicate_count,
             'validation_success_rate': (
                                                    self.total_count - self.invalid_count) / self.total_count * 100 if self.total_count > 0 else 0
         }
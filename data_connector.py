@@ -1,23 +1,33 @@
 """Main data connector module for processing customer data and sending to ShowAds API."""
 
 import logging
+import queue
+import threading
 import time
-from typing import List
+from concurrent.futures import ALL_COMPLETED, FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from typing import Callable, Dict, Generator, Tuple
 
 from config import Config
 from csv_processing import CSVProcessor
+from models import BannerBatch
 from showads_cli import ShowAdsClient
-from models import BannerRequest
 
 logger = logging.getLogger(__name__)
 
+# Validated chunks buffered between the CSV producer thread and the API senders
+READ_AHEAD_CHUNKS = 4
+
 
 class DataConnector:
     """Main data connector that orchestrates CSV processing and API communication."""
 
-    def __init__(self, config: Config):
-        """Initialize the data connector."""
+    def __init__(self, config: Config, sleep: Callable[[float], None] = time.sleep):
+        """Initialize the data connector.
+
+        ``sleep`` waits out the retry backoff; tests pass a recorder instead of really sleeping.
+        """
         self.config = config
+        self._sleep = sleep
         self.csv_processor = CSVProcessor(config)
         self.showads_client = ShowAdsClient(config)
 
@@ -30,23 +40,26 @@ class DataConnector:
         total_failed = 0
 
         try:
-            # Process CSV file in chunks
-            for valid_customers in self.csv_processor.process_csv_file(csv_file_path):
-                if not valid_customers:
-                    continue
+            # Chunks are sent from a thread pool so API round trips overlap
+            with ThreadPoolExecutor(max_workers=self.config.CONCURRENCY) as executor:
+                pending: Dict[Future, int] = {}
+
+                for banner_requests in self._read_ahead(csv_file_path):
+                    if not banner_requests:
+                        continue
 
-                # Convert customers to banner requests
-                banner_requests = self.csv_processor.customers_to_banner_requests(valid_customers)
+                    # Bound the chunks in flight so reading the file does not outrun the API
+                    if len(pending) >= self.config.CONCURRENCY:
+                        sent, failed = self._collect_results(pending, FIRST_COMPLETED)
+                        total_sent += sent
+                        total_failed += failed
 
-                # Send banner requests in batches
-                success = self._send_banner_requests_in_batches(banner_requests)
+                    future = executor.submit(self._send_batch, banner_requests)
+                    pending[future] = len(banner_requests)
 
-                if success:
-                    total_sent += len(banner_requests)
-                    logger.info(f"Successfully sent {len(banner_requests)} banner requests")
-                else:
-                    total_failed += len(banner_requests)
-                    logger.error(f"Failed to send {len(banner_requests)} banner requests")
+                sent, failed = self._collect_results(pending)
+                total_sent += sent
+                total_failed += failed
 
             # Log final statistics
             processing_time = time.time() - start_time
@@ -65,38 +78,78 @@ class DataConnector:
         finally:
             self.showads_client.close()
 
-    def _send_banner_requests_in_batches(self, banner_requests: List[BannerRequest]) -> bool:
-        """Send banner requests in batches, respecting API limits."""
-        batch_size = min(self.config.BATCH_SIZE, 1000)  # API limit is 1000
-        total_requests = len(banner_requests)
-
-        logger.debug(f"Sending {total_requests} banner requests in batches of {batch_size}")
-
-        for i in range(0, total_requests, batch_size):
-            batch = banner_requests[i:i + batch_size]
-            batch_num = (i // batch_size) + 1
-            total_batches = (total_requests + batch_size - 1) // batch_size
-
-            logger.debug(f"Processing batch {batch_num}/{total_batches} with {len(batch)} requests")
+    def _read_ahead(self, csv_file_path: str) -> Generator[BannerBatch, None, None]:
+        """Process the CSV file on a producer thread so parsing overlaps with API submission."""
+        chunk_queue: queue.Queue = queue.Queue(maxsize=READ_AHEAD_CHUNKS)
+        stopped = threading.Event()
+
+        def put(item) -> bool:
+            # Give up once the consumer has stopped, otherwise a full queue would block forever
+            while not stopped.is_set():
+                try:
+                    chunk_queue.put(item, timeout=0.1)
+                    return True
+                except queue.Full:
+                    continue
+            return False
 
-            max_attempts = self.config.MAX_RETRIES + 1
+        def produce() -> None:
+            try:
+                for banner_requests in self.csv_processor.process_csv_file(csv_file_path):
+                    if not put(banner_requests):
+                        return
+                put(None)
+            except Exception as e:
+                put(e)
 
-            for attempt in range(max_attempts):
-                success = self.showads_client.send_bulk_banner_requests(batch)
+        producer = threading.Thread(target=produce, name='csv-producer', daemon=True)
+        producer.start()
 
-                if success:
+        try:
+            while True:
+                item = chunk_queue.get()
+                if item is None:
                     break
-
-                if attempt < max_attempts - 1:
-                    wait_time = self.config.RETRY_DELAY * (2 ** attempt)  # Exponential backoff
-                    logger.warning(f"Batch {batch_num} failed (attempt {attempt + 1}/{max_attempts}), "
-                                   f"retrying in {wait_time} seconds...")
-                    time.sleep(wait_time)
-                else:
-                    logger.error(f"Batch {batch_num} failed after {max_attempts} attempts")
-                    return False
-
-        return True
+                if isinstance(item, Exception):
+                    raise item
+                yield item
+        finally:
+            stopped.set()
+            producer.join()
+
+    def _collect_results(self, pending: Dict[Future, int], return_when: str = ALL_COMPLETED) -> Tuple[int, int]:
+        """Wait for submitted chunks and return the number of sent and failed banner requests."""
+        sent = 0
+        failed = 0
+        done, _ = wait(pending, return_when=return_when)
+
+        for future in done:
+            count = pending.pop(future)
+            if future.result():
+                sent += count
+                logger.info(f"Successfully sent {count} banner requests")
+            else:
+                failed += count
+                logger.error(f"Failed to send {count} banner requests")
+
+        return sent, failed
+
+    def _send_batch(self, banner_batch: BannerBatch) -> bool:
+        """Send one chunk as a single bulk request, retrying with exponential backoff."""
+        max_attempts = self.config.MAX_RETRIES + 1
+
+        for attempt in range(max_attempts):
+            if self.showads_client.send_bulk_banner_requests(banner_batch):
+                return True
+
+            if attempt < max_attempts - 1:
+                wait_time = self.config.RETRY_DELAY * (2 ** attempt)  # Exponential backoff
+                logger.warning(f"Batch of {len(banner_batch)} requests failed (attempt {attempt + 1}/{max_attempts}), "
+                               f"retrying in {wait_time} seconds...")
+                self._sleep(wait_time)
+
+        logger.error(f"Batch of {len(banner_batch)} requests failed after {max_attempts} attempts")
+        return False
 
     def validate_configuration(self) -> bool:
         """Validate the configuration before processing."""
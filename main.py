@@ -6,9 +6,6 @@ import os
 import argparse
 from dotenv import load_dotenv
 
-from config import Config
-from data_connector import DataConnector
-
 
 def setup_logging(log_level: str = 'INFO') -> None:
     """Set up logging configuration."""
@@ -64,6 +61,10 @@ def main():
     if args.batch_size is not None:
         os.environ['BATCH_SIZE'] = str(args.batch_size)
 
+    # Imported only now so --help and argument errors do not pay for pandas, pyarrow and requests
+    from config import Config
+    from data_connector import DataConnector
+
     # Initialize configuration
     config = Config()
 
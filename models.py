@@ -2,8 +2,17 @@
 
 import re
 from typing import List
-from uuid import UUID
-from pydantic import BaseModel, Field, validator
+
+import numpy as np
+from pydantic import BaseModel, Field, field_validator
+
+# The whitespace Python's \s matches, written out because RE2, which matches Arrow-backed
+# columns, treats \s as ASCII only
+NAME_WHITESPACE = '\t\n\x0b\x0c\r\x1c\x1d\x1e\x1f \x85\xa0\u1680\u2000-\u200a\u2028\u2029\u202f\u205f\u3000'
+NAME_PATTERN = f'^[A-Za-z{NAME_WHITESPACE}]+$'
+
+_NAME_RE = re.compile(NAME_PATTERN)
+_UUID_RE = re.compile(r'^[0-9a-f]{8}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{12}\Z', re.IGNORECASE)
 
 
 class Customer(BaseModel):
@@ -14,23 +23,24 @@ class Customer(BaseModel):
     Cookie: str = Field(..., description="Customer cookie (UUID format)")
     Banner_id: int = Field(..., description="Banner ID (0-99)")
 
-    @validator('Name')
+    @field_validator('Name')
+    @classmethod
     def validate_name(cls, v: str) -> str:
         """Validate that name contains only letters and spaces."""
-        if not re.match(r'^[A-Za-z\s]+$', v.strip()):
+        if not _NAME_RE.match(v.strip()):
             raise ValueError('Name must contain only letters and spaces')
         return v.strip()
 
-    @validator('Cookie')
+    @field_validator('Cookie')
+    @classmethod
     def validate_cookie(cls, v: str) -> str:
         """Validate that cookie is in UUID format."""
-        try:
-            UUID(v)
-        except ValueError:
+        if not _UUID_RE.match(v):
             raise ValueError('Cookie must be in UUID format')
         return v
 
-    @validator('Banner_id')
+    @field_validator('Banner_id')
+    @classmethod
     def validate_banner_id(cls, v: int) -> int:
         """Validate that Banner_id is between 0 and 99."""
         if not 0 <= v <= 99:
@@ -64,3 +74,27 @@ class BulkBannerRequest(BaseModel):
     """Bulk banner request model."""
 
     Data: List[BannerRequest]
+
+
+class BannerBatch:
+    """Column-oriented batch of banner requests held as parallel arrays."""
+
+    __slots__ = ('cookies', 'banner_ids')
+
+    def __init__(self, cookies: np.ndarray, banner_ids: np.ndarray):
+        self.cookies = cookies
+        self.banner_ids = banner_ids
+
+    def __len__(self) -> int:
+        return len(self.cookies)
+
+    def __getitem__(self, index: slice) -> 'BannerBatch':
+        # Slicing NumPy arrays returns views, so batching does not copy the data
+        return BannerBatch(self.cookies[index], self.banner_ids[index])
+
+    def to_records(self) -> List[dict]:
+        """Build the API representation of the batch."""
+        return [
+            {'VisitorCookie': cookie, 'BannerId': banner_id}
+            for cookie, banner_id in zip(self.cookies.tolist(), self.banner_ids.tolist())
+        ]
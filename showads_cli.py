@@ -1,29 +1,55 @@
 """ShowAds API client with authentication and error handling."""
 
+import gzip
 import logging
-from typing import List, Optional
+import threading
+from typing import Optional
 from datetime import datetime, timedelta
 
+import orjson
 import requests
 from requests.adapters import HTTPAdapter
 from urllib3.util.retry import Retry
 
-from config import Config
-from models import AuthRequest, AuthResponse, BannerRequest, BulkBannerRequest
+from config import MAX_BULK_SIZE, Config
+from models import AuthRequest, AuthResponse, BannerBatch, BannerRequest
 
 logger = logging.getLogger(__name__)
 
+# Matches the CONCURRENCY upper bound so every sending thread gets a pooled connection
+POOL_SIZE = 32
+JSON_HEADERS = {"Content-Type": "application/json"}
+GZIP_JSON_HEADERS = {**JSON_HEADERS, "Content-Encoding": "gzip"}
+# Smaller bodies fit in a few packets, so compressing them would only cost CPU
+COMPRESSION_THRESHOLD = 4096
+# Servers that cannot decode gzip request bodies answer with one of these
+COMPRESSION_REJECTED_STATUSES = (400, 415)
+
 
 class ShowAdsClient:
     """Client for the ShowAds API with token management and retry logic."""
 
-    def __init__(self, config: Config):
-        """Initialize the ShowAds client."""
+    def __init__(self, config: Config, session: Optional[requests.Session] = None):
+        """Initialize the ShowAds client.
+
+        A caller-provided ``session`` is used as is, keeping its adapters and connection pools,
+        and is left open by ``close()``. The access token is never stored in its headers.
+        """
         self.config = config
         self.base_url = config.SHOWADS_API_URL
         self.project_key = config.PROJECT_KEY
         self.access_token: Optional[str] = None
         self.token_expires_at: Optional[datetime] = None
+        # Batches are sent from several threads; only one of them should renew the token
+        self._auth_lock = threading.Lock()
+        # Opt-in, and switched off for good if the server rejects the first compressed body
+        self._compress_requests = config.COMPRESS_REQUESTS
+        self._compression_accepted = False
+
+        self._owns_session = session is None
+        if session is not None:
+            self.session = session
+            return
 
         # Set up session with retry strategy
         self.session = requests.Session()
@@ -32,7 +58,7 @@ class ShowAdsClient:
             backoff_factor=config.RETRY_DELAY,
             status_forcelist=[429, 500, 502, 503, 504],
         )
-        adapter = HTTPAdapter(max_retries=retry_strategy)
+        adapter = HTTPAdapter(pool_connections=POOL_SIZE, pool_maxsize=POOL_SIZE, max_retries=retry_strategy)
         self.session.mount("http://", adapter)
         self.session.mount("https://", adapter)
 
@@ -47,7 +73,27 @@ class ShowAdsClient:
         if self._is_token_valid():
             return True
 
-        return self.authenticate()
+        with self._auth_lock:
+            # Another thread may have renewed the token while we were waiting
+            if self._is_token_valid():
+                return True
+
+            return self.authenticate()
+
+    def _reauthenticate(self, rejected_token: Optional[str]) -> bool:
+        """Renew a token the server rejected, unless another thread has already renewed it."""
+        with self._auth_lock:
+            if self.access_token != rejected_token and self._is_token_valid():
+                return True
+
+            return self.authenticate()
+
+    def _headers(self, headers: dict) -> dict:
+        """Return request headers, adding the token when the session does not carry it."""
+        if self._owns_session or not self.access_token:
+            return headers
+        return {**headers, "Authorization": f"Bearer {self.access_token}"}
+
     def authenticate(self) -> bool:
         """Authenticate with the ShowAds API and obtain access token."""
         try:
@@ -55,7 +101,7 @@ class ShowAdsClient:
 
             response = self.session.post(
                 f"{self.base_url}/auth",
-                json=auth_request.dict(),
+                json=auth_request.model_dump(),
                 timeout=30
             )
 
@@ -64,6 +110,10 @@ class ShowAdsClient:
                 self.access_token = auth_response.AccessToken
                 # Token expires in 24 hours
                 self.token_expires_at = datetime.now() + timedelta(hours=24)
+                # Every later request reuses the session headers instead of building its own; a
+                # caller's session may be shared, so its requests carry the token per request instead
+                if self._owns_session:
+                    self.session.headers.update({"Authorization": f"Bearer {self.access_token}"})
                 logger.info("Successfully authenticated with ShowAds API")
                 return True
             else:
@@ -80,16 +130,15 @@ class ShowAdsClient:
             return False
 
         try:
+            token = self.access_token
             banner_request = BannerRequest(
                 VisitorCookie=visitor_cookie,
                 BannerId=banner_id
             )
-            headers = {"Authorization": f"Bearer {self.access_token}"}
-
             response = self.session.post(
                 f"{self.base_url}/banners/show",
-                json=banner_request.dict(),
-                headers=headers,
+                data=orjson.dumps(banner_request.model_dump()),
+                headers=self._headers(JSON_HEADERS),
                 timeout=30
             )
 
@@ -98,7 +147,7 @@ class ShowAdsClient:
                 return True
             elif response.status_code == 401:
                 logger.warning("Token expired, re-authenticating...")
-                if self.authenticate():
+                if self._reauthenticate(token):
                     return self.send_banner_request(visitor_cookie, banner_id)
                 return False
             else:
@@ -109,7 +158,7 @@ class ShowAdsClient:
             logger.error(f"Error sending banner request: {str(e)}")
             return False
 
-    def send_bulk_banner_requests(self, banner_requests: List[BannerRequest]) -> bool:
+    def send_bulk_banner_requests(self, banner_requests: BannerBatch) -> bool:
         """Send bulk banner requests to the ShowAds API."""
         if not banner_requests:
             return True
@@ -117,30 +166,27 @@ class ShowAdsClient:
         if not self._ensure_authenticated():
             return False
 
-        # Ensure we don't exceed the 1000 visitor limit
-        if len(banner_requests) > 1000:
-            logger.error(f"Too many requests in batch: {len(banner_requests)} (max 1000)")
+        # Ensure we don't exceed the visitor limit
+        if len(banner_requests) > MAX_BULK_SIZE:
+            logger.error(f"Too many requests in batch: {len(banner_requests)} (max {MAX_BULK_SIZE})")
             return False
 
         try:
-            bulk_request = BulkBannerRequest(Data=banner_requests)
-            headers = {"Authorization": f"Bearer {self.access_token}"}
+            # orjson encodes straight to bytes, so requests does not serialize the payload again
+            body = orjson.dumps({"Data": banner_requests.to_records()})
 
-            response = self.session.post(
-                f"{self.base_url}/banners/show/bulk",
-                json=bulk_request.dict(),
-                headers=headers,
-                timeout=60
-            )
+            token = self.access_token
+            response = self._post_bulk(body)
+            if response.status_code == 401:
+                logger.warning("Token expired, re-authenticating...")
+                if not self._reauthenticate(token):
+                    return False
+                # The payload is already serialized, so the retry only resends the bytes
+                response = self._post_bulk(body)
 
             if response.status_code == 200:
                 logger.info(f"Successfully sent bulk banner request for {len(banner_requests)} customers")
                 return True
-            elif response.status_code == 401:
-                logger.warning("Token expired, re-authenticating...")
-                if self.authenticate():
-                    return self.send_bulk_banner_requests(banner_requests)
-                return False
             else:
                 logger.error(f"Bulk banner request failed: {response.status_code} - {response.text}")
                 return False
@@ -149,5 +195,31 @@ class ShowAdsClient:
             logger.error(f"Error sending bulk banner request: {str(e)}")
             return False
 
+    def _post_bulk(self, body: bytes) -> requests.Response:
+        """POST a serialized bulk payload, gzip-compressed when it is large enough."""
+        if self._compress_requests and len(body) > COMPRESSION_THRESHOLD:
+            response = self.session.post(
+                f"{self.base_url}/banners/show/bulk",
+                data=gzip.compress(body, compresslevel=1),
+                headers=self._headers(GZIP_JSON_HEADERS),
+                timeout=60
+            )
+            if response.status_code == 200:
+                self._compression_accepted = True
+            # Once a compressed body got through, a later 400 is about the data, not the encoding
+            if self._compression_accepted or response.status_code not in COMPRESSION_REJECTED_STATUSES:
+                return response
+
+            logger.info(f"Server rejected a compressed request ({response.status_code}), sending uncompressed")
+            self._compress_requests = False
+
+        return self.session.post(
+            f"{self.base_url}/banners/show/bulk",
+            data=body,
+            headers=self._headers(JSON_HEADERS),
+            timeout=60
+        )
+
     def close(self):
-        self.session.close()
+        if self._owns_session:
+            self.session.close()
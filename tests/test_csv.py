@@ -1,38 +1,267 @@
 """Tests for CSV processor."""
 
+import os
+from types import SimpleNamespace
 
 import pandas as pd
+import pyarrow.parquet as pq
 import pytest
 
-from config import Config
+import csv_processing
 from csv_processing import CSVProcessor
 from models import Customer
 
+VALID_COOKIE = '26555324-53df-4eb1-8835-e6c0078bb2c0'
+
 
 class TestCSVProcessor:
     """Tests for CSVProcessor class."""
 
     @pytest.fixture
-    def config(self, mocker):
-        """Create a test configuration."""
-        config = mocker.Mock(spec=Config)
-        config.MIN_AGE = 18
-        config.MAX_AGE = 65
-        return config
+    def config(self):
+        """Create a test configuration with only the settings CSVProcessor reads."""
+        return SimpleNamespace(
+            MIN_AGE=18,
+            MAX_AGE=65,
+            VALIDATION_WORKERS=1,
+            BATCH_SIZE=1000,
+            PARQUET_CACHE=False
+        )
 
     @pytest.fixture
     def processor(self, config):
         """Create a CSVProcessor instance."""
         return CSVProcessor(config)
 
+    def test_process_csv_chunk_drops_duplicates(self, processor):
+        """Test that repeated cookie and banner pairs are sent once per chunk."""
+        data = {
+            'Name': ['John Doe', 'John Doe', 'Jane Smith'],
+            'Age': [35, 35, 28],
+            'Cookie': [
+                '26555324-53df-4eb1-8835-e6c0078bb2c0',
+                '26555324-53df-4eb1-8835-e6c0078bb2c0',
+                '26555324-53df-4eb1-8835-e6c0078bb2c0'
+            ],
+            'Banner_id': [42, 42, 25]
+        }
+        chunk = pd.DataFrame(data)
+
+        banner_requests = processor.process_csv_chunk(chunk).to_records()
+
+        assert banner_requests == [
+            {'VisitorCookie': '26555324-53df-4eb1-8835-e6c0078bb2c0', 'BannerId': 42},
+            {'VisitorCookie': '26555324-53df-4eb1-8835-e6c0078bb2c0', 'BannerId': 25}
+        ]
+        assert processor.invalid_count == 0
+        assert processor.duplicate_count == 1
+        assert processor.get_statistics()['duplicate_records'] == 1
+
+    def test_read_csv_in_chunks(self, processor, tmp_path):
+        """Test chunked reading keeps only the expected columns."""
+        csv_file = tmp_path / 'data.csv'
+        csv_file.write_text(
+            'Name,Age,Cookie,Banner_id,Extra\n'
+            'John Doe,35,26555324-53df-4eb1-8835-e6c0078bb2c0,42,x\n'
+            'Jane Smith,abc,12345678-1234-5678-9abc-123456789012,,y\n'
+            'Bob Johnson,999,98765432-4321-8765-dcba-987654321098,15,z\n'
+        )
+
+        chunks = list(processor.read_csv_in_chunks(str(csv_file), chunk_size=2))
+
+        assert [len(chunk) for chunk in chunks] == [2, 1]
+        assert list(chunks[0].columns) == ['Name', 'Age', 'Cookie', 'Banner_id']
+
+        # Malformed integers are parsed to <NA> rather than failing the read
+        assert chunks[0]['Age'].tolist()[0] == 35
+        assert pd.isna(chunks[0]['Age'].iloc[1])
+        assert pd.isna(chunks[0]['Banner_id'].iloc[1])
+        # Values too large for the narrow column types are <NA> as well
+        assert pd.isna(chunks[1]['Age'].iloc[0])
+        assert chunks[0]['Age'].dtype == pd.UInt8Dtype()
+        assert chunks[0]['Banner_id'].dtype == pd.Int16Dtype()
+
+    def test_process_csv_file_chunks_respect_api_limit(self, config, tmp_path):
+        """Test that chunks are sized by BATCH_SIZE but never exceed the API limit of 1000."""
+        csv_file = tmp_path / 'data.csv'
+        rows = ''.join(f'John Doe,35,26555324-53df-4eb1-8835-{i:012x},{i % 100}\n' for i in range(2500))
+        csv_file.write_text('Name,Age,Cookie,Banner_id\n' + rows)
+        # Set config batch size higher than API limit
+        config.BATCH_SIZE = 1500
+        processor = CSVProcessor(config)
+
+        batch_sizes = [len(batch) for batch in processor.process_csv_file(str(csv_file))]
+
+        assert batch_sizes == [1000, 1000, 500]
+
+    def test_process_csv_file_batches_follow_bulk_limit(self, config, mocker, tmp_path):
+        """Test that batching uses the same bulk limit as the API client."""
+        csv_file = tmp_path / 'data.csv'
+        rows = ''.join(f'John Doe,35,26555324-53df-4eb1-8835-{i:012x},{i % 100}\n' for i in range(5))
+        csv_file.write_text('Name,Age,Cookie,Banner_id\n' + rows)
+        mocker.patch('csv_processing.MAX_BULK_SIZE', 2)
+        processor = CSVProcessor(config)
+
+        batch_sizes = [len(batch) for batch in processor.process_csv_file(str(csv_file))]
+
+        assert batch_sizes == [2, 2, 1]
+
+    def test_process_csv_file_fills_batches_after_filtering(self, config, tmp_path):
+        """Test that invalid rows do not leave partially filled batches behind."""
+        csv_file = tmp_path / 'data.csv'
+        csv_file.write_text(
+            'Name,Age,Cookie,Banner_id\n'
+            'John Doe,35,26555324-53df-4eb1-8835-e6c0078bb2c0,42\n'
+            'Jane Smith,abc,12345678-1234-5678-9abc-123456789012,25\n'
+            'Bob Johnson,45,98765432-4321-8765-dcba-987654321098,15\n'
+            'Eve Adams,28,11111111-2222-3333-4444-555555555555,67\n'
+            'Tom Lee,40,33333333-4444-5555-6666-777777777777,99\n'
+        )
+        config.BATCH_SIZE = 2
+        processor = CSVProcessor(config)
+
+        batches = list(processor.process_csv_file(str(csv_file)))
+
+        assert [len(batch) for batch in batches] == [2, 2]
+        assert processor.invalid_count == 1
+        # Batches are views into the validated chunk, not copies
+        assert batches[0].cookies.base is batches[1].cookies.base
+        assert batches[0].banner_ids.base is batches[1].banner_ids.base
+
+    def test_process_csv_file_streams_chunks(self, processor, monkeypatch, tmp_path):
+        """Test that chunks are read lazily instead of loading the whole file up front."""
+        csv_file = tmp_path / 'data.csv'
+        rows = ''.join(f'John Doe,35,26555324-53df-4eb1-8835-{i:012x},{i}\n' for i in range(6))
+        csv_file.write_text('Name,Age,Cookie,Banner_id\n' + rows)
+        monkeypatch.setattr(csv_processing, 'VALIDATION_CHUNK_SIZE', 2)
+
+        batches = processor.process_csv_file(str(csv_file))
+        assert processor.total_count == 0
+
+        assert len(next(batches)) == 2
+        assert processor.total_count == 2
+
+        assert [len(batch) for batch in batches] == [2, 2]
+        assert processor.total_count == 6
+
+    def test_read_csv_in_chunks_file_not_found(self, processor, tmp_path):
+        """Test that a missing CSV file is reported."""
+        with pytest.raises(FileNotFoundError):
+            list(processor.read_csv_in_chunks(str(tmp_path / 'missing.csv')))
+
+    def test_process_csv_file_malformed_numbers(self, processor, tmp_path):
+        """Test that malformed numeric fields invalidate rows without failing the read."""
+        csv_file = tmp_path / 'data.csv'
+        csv_file.write_text(
+            'Name,Age,Cookie,Banner_id\n'
+            'John Doe,35,26555324-53df-4eb1-8835-e6c0078bb2c0,42\n'
+            'Jane Smith,abc,12345678-1234-5678-9abc-123456789012,25\n'
+            'Bob Johnson,45,98765432-4321-8765-dcba-987654321098,\n'
+        )
+
+        batches = [batch.to_records() for batch in processor.process_csv_file(str(csv_file))]
+
+        assert batches == [[{'VisitorCookie': '26555324-53df-4eb1-8835-e6c0078bb2c0', 'BannerId': 42}]]
+        assert processor.total_count == 3
+        assert processor.invalid_count == 2
+
+    def test_process_csv_file_unicode_whitespace_in_name(self, processor, tmp_path):
+        """Test that the Arrow-backed name check accepts the same Unicode whitespace as the Customer model."""
+        csv_file = tmp_path / 'data.csv'
+        csv_file.write_text(
+            'Name,Age,Cookie,Banner_id\n'
+            'John\u00a0Doe,35,26555324-53df-4eb1-8835-e6c0078bb2c0,42\n'
+            'Jane\u3000Smith,28,12345678-1234-5678-9abc-123456789012,25\n',
+            encoding='utf-8'
+        )
+
+        batches = [batch.to_records() for batch in processor.process_csv_file(str(csv_file))]
+
+        assert batches == [[
+            {'VisitorCookie': '26555324-53df-4eb1-8835-e6c0078bb2c0', 'BannerId': 42},
+            {'VisitorCookie': '12345678-1234-5678-9abc-123456789012', 'BannerId': 25}
+        ]]
+        assert processor.invalid_count == 0
+
+    def test_process_csv_file_parquet_cache(self, config, tmp_path):
+        """Test that a Parquet side file is written once and reused on later runs."""
+        csv_file = tmp_path / 'data.csv'
+        csv_file.write_text(
+            'Name,Age,Cookie,Banner_id\n'
+            'John Doe,35,26555324-53df-4eb1-8835-e6c0078bb2c0,42\n'
+            'Jane Smith,abc,12345678-1234-5678-9abc-123456789012,25\n'
+        )
+        config.PARQUET_CACHE = True
+        processor = CSVProcessor(config)
+
+        first_run = [batch.to_records() for batch in processor.process_csv_file(str(csv_file))]
+        parquet_file = tmp_path / 'data.csv.parquet'
+        assert parquet_file.exists()
+        cached_at = parquet_file.stat().st_mtime_ns
+
+        second_run = [batch.to_records() for batch in processor.process_csv_file(str(csv_file))]
+
+        assert first_run == second_run == [[{'VisitorCookie': '26555324-53df-4eb1-8835-e6c0078bb2c0', 'BannerId': 42}]]
+        assert parquet_file.stat().st_mtime_ns == cached_at
+        assert processor.invalid_count == 1
+
+    def test_ensure_parquet_rebuilds_stale_file(self, config, tmp_path):
+        """Test that a Parquet side file older than its CSV is rebuilt."""
+        csv_file = tmp_path / 'data.csv'
+        csv_file.write_text('Name,Age,Cookie,Banner_id\n')
+        parquet_file = tmp_path / 'data.csv.parquet'
+        parquet_file.write_text('stale')
+        os.utime(parquet_file, (0, 0))
+        processor = CSVProcessor(config)
+
+        assert processor.ensure_parquet(str(csv_file)) == str(parquet_file)
+        assert pq.ParquetFile(parquet_file).schema_arrow.names == ['Name', 'Age', 'Cookie', 'Banner_id']
+
+    def test_ensure_parquet_unwritable_directory(self, config, mocker, tmp_path):
+        """Test that the CSV is read directly when the side file cannot be written."""
+        csv_file = tmp_path / 'data.csv'
+        csv_file.write_text(
+            'Name,Age,Cookie,Banner_id\n'
+            'John Doe,35,26555324-53df-4eb1-8835-e6c0078bb2c0,42\n'
+        )
+        config.PARQUET_CACHE = True
+        processor = CSVProcessor(config)
+        mocker.patch('pyarrow.parquet.ParquetWriter', side_effect=PermissionError('read-only file system'))
+
+        batches = [batch.to_records() for batch in processor.process_csv_file(str(csv_file))]
+
+        assert batches == [[{'VisitorCookie': '26555324-53df-4eb1-8835-e6c0078bb2c0', 'BannerId': 42}]]
+        assert list(tmp_path.iterdir()) == [csv_file]
+
+    def test_process_csv_file_validation_workers(self, config, tmp_path):
+        """Test that validating in worker processes yields the same results in file order."""
+        csv_file = tmp_path / 'data.csv'
+        csv_file.write_text(
+            'Name,Age,Cookie,Banner_id\n'
+            'John Doe,35,26555324-53df-4eb1-8835-e6c0078bb2c0,42\n'
+            'Jane Smith,abc,12345678-1234-5678-9abc-123456789012,25\n'
+            'Bob Johnson,45,98765432-4321-8765-dcba-987654321098,15\n'
+        )
+        config.VALIDATION_WORKERS = 2
+        processor = CSVProcessor(config)
+
+        batches = [batch.to_records() for batch in processor.process_csv_file(str(csv_file))]
+
+        assert batches == [[
+            {'VisitorCookie': '26555324-53df-4eb1-8835-e6c0078bb2c0', 'BannerId': 42},
+            {'VisitorCookie': '98765432-4321-8765-dcba-987654321098', 'BannerId': 15}
+        ]]
+        assert processor.total_count == 3
+        assert processor.invalid_count == 1
+
     def test_validate_customer_row_valid(self, processor):
         """Test validation of a valid customer row."""
-        row = pd.Series({
+        row = {
             'Name': 'John Doe',
             'Age': 35,
             'Cookie': '26555324-53df-4eb1-8835-e6c0078bb2c0',
             'Banner_id': 42
-        })
+        }
 
         customer, is_valid = processor.validate_customer_row(row)
 
@@ -42,14 +271,42 @@ class TestCSVProcessor:
         assert customer.Cookie == '26555324-53df-4eb1-8835-e6c0078bb2c0'
         assert customer.Banner_id == 42
 
+    def test_validate_customer_row_series(self, processor):
+        """Test that a pandas Series row is still accepted."""
+        row = pd.Series({
+            'Name': 'John Doe',
+            'Age': 35,
+            'Cookie': '26555324-53df-4eb1-8835-e6c0078bb2c0',
+            'Banner_id': 42
+        })
+
+        customer, is_valid = processor.validate_customer_row(row)
+
+        assert is_valid
+        assert customer.Banner_id == 42
+
+    def test_validate_customer_row_strips_name(self, processor):
+        """Test that a valid row builds its customer with the name stripped."""
+        row = {
+            'Name': '  John Doe ',
+            'Age': 35,
+            'Cookie': '26555324-53df-4eb1-8835-e6c0078bb2c0',
+            'Banner_id': 42
+        }
+
+        customer, is_valid = processor.validate_customer_row(row)
+
+        assert is_valid
+        assert customer.Name == 'John Doe'
+
     def test_validate_customer_row_invalid_name(self, processor):
         """Test validation of invalid name."""
-        row = pd.Series({
+        row = {
             'Name': 'John123',
             'Age': 35,
             'Cookie': '26555324-53df-4eb1-8835-e6c0078bb2c0',
             'Banner_id': 42
-        })
+        }
 
         customer, is_valid = processor.validate_customer_row(row)
 
@@ -58,12 +315,12 @@ class TestCSVProcessor:
 
     def test_validate_customer_row_invalid_age_below_minimum(self, processor):
         """Test validation of age below minimum."""
-        row = pd.Series({
+        row = {
             'Name': 'John Doe',
             'Age': 16,
             'Cookie': '26555324-53df-4eb1-8835-e6c0078bb2c0',
             'Banner_id': 42
-        })
+        }
 
         customer, is_valid = processor.validate_customer_row(row)
 
@@ -72,12 +329,12 @@ class TestCSVProcessor:
 
     def test_validate_customer_row_invalid_age_above_maximum(self, processor):
         """Test validation of age above maximum."""
-        row = pd.Series({
+        row = {
             'Name': 'John Doe',
             'Age': 70,
             'Cookie': '26555324-53df-4eb1-8835-e6c0078bb2c0',
             'Banner_id': 42
-        })
+        }
 
         customer, is_valid = processor.validate_customer_row(row)
 
@@ -86,11 +343,25 @@ class TestCSVProcessor:
 
     def test_validate_customer_row_invalid_cookie(self, processor):
         """Test validation of invalid cookie format."""
-        row = pd.Series({
+        row = {
             'Name': 'John Doe',
             'Age': 35,
             'Cookie': 'invalid-uuid',
             'Banner_id': 42
+        }
+
+        customer, is_valid = processor.validate_customer_row(row)
+
+        assert not is_valid
+        assert customer is None
+
+    def test_validate_customer_row_non_string_name(self, processor):
+        """Test that a non-string name is rejected instead of failing the check."""
+        row = pd.Series({
+            'Name': 123,
+            'Age': 30,
+            'Cookie': '26555324-53df-4eb1-8835-e6c0078bb2c0',
+            'Banner_id': 5
         })
 
         customer, is_valid = processor.validate_customer_row(row)
@@ -98,20 +369,104 @@ class TestCSVProcessor:
         assert not is_valid
         assert customer is None
 
+    def test_validate_customer_row_cookie_trailing_newline(self, processor):
+        """Test that a cookie followed by a newline is rejected, as it is in CSV chunks."""
+        row = {
+            'Name': 'John Doe',
+            'Age': 35,
+            'Cookie': '26555324-53df-4eb1-8835-e6c0078bb2c0\n',
+            'Banner_id': 42
+        }
+
+        customer, is_valid = processor.validate_customer_row(row)
+
+        assert not is_valid
+        assert customer is None
+
+    def test_validate_customer_row_checked_by_model(self, processor, mocker):
+        """Test that a row passing the chunk rules is still validated by the Customer model."""
+        mocker.patch('csv_processing.UUID_PATTERN', r'^.+')
+        row = {
+            'Name': 'John Doe',
+            'Age': 35,
+            'Cookie': '26555324-53df-4eb1-8835-e6c0078bb2c0\n',
+            'Banner_id': 42
+        }
+
+        customer, is_valid = processor.validate_customer_row(row)
+
+        assert not is_valid
+        assert customer is None
+
+    def test_validate_customer_row_dict_non_string_values(self, processor):
+        """Test that non-string and missing values in a dict are rejected instead of failing the check."""
+        row = {
+            'Name': 123,
+            'Age': 35,
+            'Cookie': '26555324-53df-4eb1-8835-e6c0078bb2c0',
+            'Banner_id': None
+        }
+
+        customer, is_valid = processor.validate_customer_row(row)
+
+        assert not is_valid
+        assert customer is None
+
+    @pytest.mark.parametrize('banner_id', ['42', ' 42 ', '42.9', '42.0', '4e1', '0x2a'])
+    def test_integer_rule_shared_by_all_paths(self, config, tmp_path, banner_id):
+        """Test that a CSV file, a chunk and a single row get the same verdict on an integer field."""
+        csv_file = tmp_path / 'data.csv'
+        csv_file.write_text(f'Name,Age,Cookie,Banner_id\nJohn Doe,35,{VALID_COOKIE},{banner_id}\n')
+        row = {'Name': 'John Doe', 'Age': '35', 'Cookie': VALID_COOKIE, 'Banner_id': banner_id}
+        file_processor = CSVProcessor(config)
+
+        list(file_processor.process_csv_file(str(csv_file)))
+        chunk_valid = len(CSVProcessor(config).process_csv_chunk(pd.DataFrame([row]))) == 1
+        _, row_valid = CSVProcessor(config).validate_customer_row(row)
+
+        assert chunk_valid == row_valid == (file_processor.invalid_count == 0)
+
+    @pytest.mark.parametrize('field,value', [('Age', 35.7), ('Age', '35.0'), ('Banner_id', 42.9)])
+    def test_validate_customer_row_non_integer_number(self, processor, caplog, field, value):
+        """Test that numbers that are not whole fail validation instead of being truncated."""
+        row = {'Name': 'John Doe', 'Age': 35, 'Cookie': VALID_COOKIE, 'Banner_id': 42, field: value}
+
+        with caplog.at_level('WARNING', logger='csv_processing'):
+            customer, is_valid = processor.validate_customer_row(row)
+
+        assert not is_valid
+        assert customer is None
+        assert f'Failed validation of {field}' in caplog.text
+
     def test_validate_customer_row_invalid_banner_id(self, processor):
         """Test validation of invalid banner ID."""
-        row = pd.Series({
+        row = {
             'Name': 'John Doe',
             'Age': 35,
             'Cookie': '26555324-53df-4eb1-8835-e6c0078bb2c0',
             'Banner_id': 100
-        })
+        }
 
         customer, is_valid = processor.validate_customer_row(row)
 
         assert not is_valid
         assert customer is None
 
+    def test_validate_customer_row_missing_field(self, processor, caplog):
+        """Test that a row without every column is invalid and names the failed rules."""
+        row = {
+            'Name': 'John Doe',
+            'Cookie': '26555324-53df-4eb1-8835-e6c0078bb2c0',
+            'Banner_id': 100
+        }
+
+        with caplog.at_level('WARNING', logger='csv_processing'):
+            customer, is_valid = processor.validate_customer_row(row)
+
+        assert not is_valid
+        assert customer is None
+        assert 'Failed validation of Age, Banner_id' in caplog.text
+
     def test_process_csv_chunk(self, processor):
         """Test processing a CSV chunk."""
         # Create test data
@@ -127,40 +482,115 @@ class TestCSVProcessor:
         }
         chunk = pd.DataFrame(data)
 
-        valid_customers = processor.process_csv_chunk(chunk)
+        banner_requests = processor.process_csv_chunk(chunk).to_records()
 
-        assert len(valid_customers) == 2
+        assert len(banner_requests) == 2
         assert processor.total_count == 3
         assert processor.invalid_count == 1
 
-        # Check valid customers
-        assert valid_customers[0].Name == 'John Doe'
-        assert valid_customers[1].Name == 'Jane Smith'
-
-    def test_customers_to_banner_requests(self, processor):
-        """Test conversion of customers to banner requests."""
-        customers = [
-            Customer(
-                Name='John Doe',
-                Age=35,
-                Cookie='26555324-53df-4eb1-8835-e6c0078bb2c0',
-                Banner_id=42
-            ),
-            Customer(
-                Name='Jane Smith',
-                Age=28,
-                Cookie='12345678-1234-5678-9abc-123456789012',
-                Banner_id=25
-            )
-        ]
+        # Check banner requests built from valid rows
+        assert banner_requests[0]['VisitorCookie'] == '26555324-53df-4eb1-8835-e6c0078bb2c0'
+        assert banner_requests[0]['BannerId'] == 42
+        assert banner_requests[1]['VisitorCookie'] == '12345678-1234-5678-9abc-123456789012'
+        assert banner_requests[1]['BannerId'] == 25
 
-        banner_requests = processor.customers_to_banner_requests(customers)
+    def test_process_csv_chunk_builds_no_customers(self, processor, mocker):
+        """Test that chunks go straight to banner request columns without per-row customer objects."""
+        init = mocker.spy(Customer, '__init__')
+        construct = mocker.spy(Customer, 'model_construct')
+        data = {
+            'Name': ['John Doe', 'Jane Smith'],
+            'Age': [35, 28],
+            'Cookie': ['26555324-53df-4eb1-8835-e6c0078bb2c0', '12345678-1234-5678-9abc-123456789012'],
+            'Banner_id': [42, 25]
+        }
+        chunk = pd.DataFrame(data)
 
-        assert len(banner_requests) == 2
-        assert banner_requests[0].VisitorCookie == '26555324-53df-4eb1-8835-e6c0078bb2c0'
-        assert banner_requests[0].BannerId == 42
-        assert banner_requests[1].VisitorCookie == '12345678-1234-5678-9abc-123456789012'
-        assert banner_requests[1].BannerId == 25
+        banner_requests = processor.process_csv_chunk(chunk)
+
+        assert banner_requests.cookies.tolist() == data['Cookie']
+        assert banner_requests.banner_ids.tolist() == data['Banner_id']
+        init.assert_not_called()
+        construct.assert_not_called()
+
+    def test_process_csv_chunk_invalid_columns(self, processor):
+        """Test that every validation rule is applied column-wise."""
+        data = {
+            'Name': ['John Doe', 'Jane Smith', 'Bob Brown', 'Eve Adams', 'Tom Lee'],
+            'Age': [35, 'abc', 70, 28, 40],
+            'Cookie': [
+                '26555324-53df-4eb1-8835-e6c0078bb2c0',
+                '12345678-1234-5678-9abc-123456789012',
+                '98765432-4321-8765-dcba-987654321098',
+                'invalid-uuid',
+                '11111111-2222-3333-4444-555555555555'
+            ],
+            'Banner_id': [42, 25, 15, 67, 100]
+        }
+        chunk = pd.DataFrame(data)
+
+        banner_requests = processor.process_csv_chunk(chunk).to_records()
+
+        assert len(banner_requests) == 1
+        assert banner_requests[0]['VisitorCookie'] == '26555324-53df-4eb1-8835-e6c0078bb2c0'
+        assert processor.total_count == 5
+        assert processor.invalid_count == 4
+
+    def test_process_csv_chunk_range_boundaries(self, processor):
+        """Test that the Age and Banner_id ranges are inclusive on both ends."""
+        data = {
+            'Name': ['John Doe'] * 6,
+            'Age': pd.array([18, 65, 17, 66, 40, 40], dtype='UInt8'),
+            'Cookie': [f'26555324-53df-4eb1-8835-{i:012x}' for i in range(6)],
+            'Banner_id': pd.array([0, 99, 50, 50, -1, 100], dtype='Int16')
+        }
+        chunk = pd.DataFrame(data)
+
+        banner_requests = processor.process_csv_chunk(chunk)
+
+        assert banner_requests.cookies.tolist() == data['Cookie'][:2]
+        assert banner_requests.banner_ids.tolist() == [0, 99]
+        assert processor.invalid_count == 4
+
+    def test_process_csv_chunk_rejects_uuid_variants(self, processor):
+        """Test that only the hyphenated 36-character UUID layout is accepted for cookies."""
+        data = {
+            'Name': ['John Doe'] * 5,
+            'Age': [35] * 5,
+            'Cookie': [
+                '26555324-53DF-4EB1-8835-E6C0078BB2C0',
+                '2655532453df4eb18835e6c0078bb2c0',
+                '{26555324-53df-4eb1-8835-e6c0078bb2c0}',
+                'urn:uuid:26555324-53df-4eb1-8835-e6c0078bb2c0',
+                '26555324-53df-4eb1-8835-e6c0078bb2c0-'
+            ],
+            'Banner_id': [42] * 5
+        }
+        chunk = pd.DataFrame(data)
+
+        banner_requests = processor.process_csv_chunk(chunk).to_records()
+
+        assert banner_requests == [{'VisitorCookie': '26555324-53DF-4EB1-8835-E6C0078BB2C0', 'BannerId': 42}]
+        assert processor.invalid_count == 4
+
+    def test_process_csv_chunk_logs_failures_per_field(self, processor, caplog):
+        """Test that one summary warning per chunk counts the failures of each rule."""
+        data = {
+            'Name': ['John123', 'Jane Smith', 'Bob Brown'],
+            'Age': [10, 12, 40],
+            'Cookie': [
+                '26555324-53df-4eb1-8835-e6c0078bb2c0',
+                'invalid-uuid',
+                '98765432-4321-8765-dcba-987654321098'
+            ],
+            'Banner_id': [42, 25, 15]
+        }
+        chunk = pd.DataFrame(data)
+
+        with caplog.at_level('WARNING', logger='csv_processing'):
+            processor.process_csv_chunk(chunk)
+
+        assert caplog.messages == ['Skipped 2 invalid records out of 3 in chunk (Name: 1, Age: 2, Cookie: 1)']
 
     def test_get_statistics(self, processor):
         """Test getting processing statistics."""
@@ -1,9 +1,18 @@
 """Tests for data models."""
 
+import re
+from types import MappingProxyType
+
+import numpy as np
 import pytest
 from pydantic import ValidationError
 
-from models import Customer, AuthRequest, AuthResponse, BannerRequest, BulkBannerRequest
+import models
+from models import Customer, AuthRequest, AuthResponse, BannerBatch, BannerRequest, BulkBannerRequest
+
+VALID_COOKIE = "26555324-53df-4eb1-8835-e6c0078bb2c0"
+# Read-only, so tests can only derive variants with {**BASE_CUSTOMER, field: value}
+BASE_CUSTOMER = MappingProxyType({"Name": "John Doe", "Age": 35, "Cookie": VALID_COOKIE, "Banner_id": 42})
 
 
 class TestCustomer:
@@ -11,127 +20,85 @@ class TestCustomer:
 
     def test_valid_customer(self):
         """Test creating a valid customer."""
-        customer = Customer(
-            Name="John Doe",
-            Age=35,
-            Cookie="26555324-53df-4eb1-8835-e6c0078bb2c0",
-            Banner_id=42
-        )
+        customer = Customer.model_validate(dict(BASE_CUSTOMER))
         assert customer.Name == "John Doe"
         assert customer.Age == 35
-        assert customer.Cookie == "26555324-53df-4eb1-8835-e6c0078bb2c0"
+        assert customer.Cookie == VALID_COOKIE
         assert customer.Banner_id == 42
 
-    def test_invalid_name_with_numbers(self):
-        """Test that names with numbers are invalid."""
+    @pytest.mark.parametrize("field,value", [
+        ("Name", "John123"),
+        ("Name", "John@Doe"),
+        ("Cookie", "invalid-uuid"),
+        ("Cookie", "2655532453df4eb18835e6c0078bb2c0"),
+        ("Banner_id", -1),
+        ("Banner_id", 100),
+    ])
+    def test_invalid_field(self, field, value):
+        """Test that a single invalid field rejects the customer."""
         with pytest.raises(ValidationError):
-            Customer(
-                Name="John123",
-                Age=35,
-                Cookie="26555324-53df-4eb1-8835-e6c0078bb2c0",
-                Banner_id=42
-            )
-
-    def test_invalid_name_with_special_chars(self):
-        """Test that names with special characters are invalid."""
-        with pytest.raises(ValidationError):
-            Customer(
-                Name="John@Doe",
-                Age=35,
-                Cookie="26555324-53df-4eb1-8835-e6c0078bb2c0",
-                Banner_id=42
-            )
+            Customer.model_validate({**BASE_CUSTOMER, field: value})
 
     def test_valid_name_with_spaces(self):
         """Test that names with spaces are valid."""
-        customer = Customer(
-            Name="John Doe Smith",
-            Age=35,
-            Cookie="26555324-53df-4eb1-8835-e6c0078bb2c0",
-            Banner_id=42
-        )
+        customer = Customer.model_validate({**BASE_CUSTOMER, "Name": "John Doe Smith"})
         assert customer.Name == "John Doe Smith"
 
-    def test_invalid_cookie_format(self):
-        """Test that invalid UUID format is rejected."""
-        with pytest.raises(ValidationError):
-            Customer(
-                Name="John Doe",
-                Age=35,
-                Cookie="invalid-uuid",
-                Banner_id=42
-            )
+    def test_name_whitespace_matches_python_whitespace(self):
+        """Test that the written-out name whitespace is exactly the whitespace Python's \\s matches."""
+        name_whitespace = re.compile(f'[{models.NAME_WHITESPACE}]')
 
-    def test_banner_id_below_range(self):
-        """Test that Banner_id below 0 is invalid."""
-        with pytest.raises(ValidationError):
-            Customer(
-                Name="John Doe",
-                Age=35,
-                Cookie="26555324-53df-4eb1-8835-e6c0078bb2c0",
-                Banner_id=-1
-            )
+        # U+3000 is the highest whitespace code point
+        for char in map(chr, range(0x3001)):
+            assert bool(name_whitespace.fullmatch(char)) == bool(re.fullmatch(r'\s', char)), hex(ord(char))
 
-    def test_banner_id_above_range(self):
-        """Test that Banner_id above 99 is invalid."""
-        with pytest.raises(ValidationError):
-            Customer(
-                Name="John Doe",
-                Age=35,
-                Cookie="26555324-53df-4eb1-8835-e6c0078bb2c0",
-                Banner_id=100
-            )
+    def test_valid_name_with_non_breaking_space(self):
+        """Test that names may contain Unicode whitespace such as a non-breaking space."""
+        customer = Customer.model_validate({**BASE_CUSTOMER, "Name": "John\u00a0Doe"})
+        assert customer.Name == "John\u00a0Doe"
+
+    def test_valid_cookie_uppercase(self):
+        """Test that upper-case UUIDs are accepted."""
+        customer = Customer.model_validate({**BASE_CUSTOMER, "Cookie": "26555324-53DF-4EB1-8835-E6C0078BB2C0"})
+        assert customer.Cookie == "26555324-53DF-4EB1-8835-E6C0078BB2C0"
 
     def test_banner_id_boundary_values(self):
         """Test Banner_id boundary values (0 and 99)."""
-        customer_0 = Customer(
-            Name="John Doe",
-            Age=35,
-            Cookie="26555324-53df-4eb1-8835-e6c0078bb2c0",
-            Banner_id=0
-        )
+        customer_0 = Customer.model_validate({**BASE_CUSTOMER, "Banner_id": 0})
         assert customer_0.Banner_id == 0
 
-        customer_99 = Customer(
-            Name="Jane Doe",
-            Age=35,
-            Cookie="26555324-53df-4eb1-8835-e6c0078bb2c0",
-            Banner_id=99
-        )
+        customer_99 = Customer.model_validate({**BASE_CUSTOMER, "Name": "Jane Doe", "Banner_id": 99})
         assert customer_99.Banner_id == 99
 
     def test_validate_age_within_range(self):
         """Test age validation within valid range."""
-        customer = Customer(
-            Name="John Doe",
-            Age=25,
-            Cookie="26555324-53df-4eb1-8835-e6c0078bb2c0",
-            Banner_id=42
-        )
+        customer = Customer.model_validate({**BASE_CUSTOMER, "Age": 25})
         # Should not raise exception
         customer.validate_age(18, 65)
 
     def test_validate_age_below_minimum(self):
         """Test age validation below minimum."""
-        customer = Customer(
-            Name="John Doe",
-            Age=16,
-            Cookie="26555324-53df-4eb1-8835-e6c0078bb2c0",
-            Banner_id=42
-        )
-        with pytest.raises(ValueError, match="Age must be between 18 and 65"):
+        customer = Customer.model_validate({**BASE_CUSTOMER, "Age": 16})
+        with pytest.raises(ValueError) as exc:
             customer.validate_age(18, 65)
+        assert str(exc.value) == "Age must be between 18 and 65"
 
     def test_validate_age_above_maximum(self):
         """Test age validation above maximum."""
-        customer = Customer(
-            Name="John Doe",
-            Age=70,
-            Cookie="26555324-53df-4eb1-8835-e6c0078bb2c0",
-            Banner_id=42
-        )
-        with pytest.raises(ValueError, match="Age must be between 18 and 65"):
+        customer = Customer.model_validate({**BASE_CUSTOMER, "Age": 70})
+        with pytest.raises(ValueError) as exc:
             customer.validate_age(18, 65)
+        assert str(exc.value) == "Age must be between 18 and 65"
+
+    def test_validators_reuse_compiled_patterns(self, mocker):
+        """Test that validating customers never compiles a regex again."""
+        assert isinstance(models._NAME_RE, re.Pattern)
+        assert isinstance(models._UUID_RE, re.Pattern)
+        for helper in ('compile', 'match', 'fullmatch', 'search'):
+            mocker.patch(f're.{helper}', side_effect=AssertionError(f're.{helper} called during validation'))
+
+        for banner_id in range(100):
+            Customer.model_validate({**BASE_CUSTOMER, "Banner_id": banner_id})
 
 
 class TestAPIModels:
@@ -150,17 +117,24 @@ class TestAPIModels:
     def test_banner_request(self):
         """Test BannerRequest model."""
         banner_req = BannerRequest(
-            VisitorCookie="26555324-53df-4eb1-8835-e6c0078bb2c0",
+            VisitorCookie=VALID_COOKIE,
             BannerId=42
         )
-        assert banner_req.VisitorCookie == "26555324-53df-4eb1-8835-e6c0078bb2c0"
+        assert banner_req.VisitorCookie == VALID_COOKIE
         assert banner_req.BannerId == 42
 
+    def test_bulk_banner_request_from_json(self):
+        """Test validating a bulk payload straight from JSON bytes."""
+        bulk_req = BulkBannerRequest.model_validate_json(
+            b'{"Data": [{"VisitorCookie": "%s", "BannerId": 42}]}' % VALID_COOKIE.encode()
+        )
+        assert bulk_req.Data == [BannerRequest(VisitorCookie=VALID_COOKIE, BannerId=42)]
+
     def test_bulk_banner_request(self):
         """Test BulkBannerRequest model."""
         banner_requests = [
             BannerRequest(
-                VisitorCookie="26555324-53df-4eb1-8835-e6c0078bb2c0",
+                VisitorCookie=VALID_COOKIE,
                 BannerId=42
             ),
             BannerRequest(
@@ -172,3 +146,19 @@ class TestAPIModels:
         assert len(bulk_req.Data) == 2
         assert bulk_req.Data[0].BannerId == 42
         assert bulk_req.Data[1].BannerId == 25
+
+    def test_banner_batch(self):
+        """Test BannerBatch length, slicing and record conversion."""
+        batch = BannerBatch(
+            np.array([VALID_COOKIE, "12345678-1234-5678-9abc-123456789012"], dtype=object),
+            np.array([42, 25], dtype=np.int16)
+        )
+
+        assert len(batch) == 2
+        assert len(batch[1:]) == 1
+        assert batch[1:].cookies.base is batch.cookies
+        assert batch.to_records() == [
+            {"VisitorCookie": VALID_COOKIE, "BannerId": 42},
+            {"VisitorCookie": "12345678-1234-5678-9abc-123456789012", "BannerId": 25}
+        ]
+        assert type(batch.to_records()[0]["BannerId"]) is int
@@ -1,192 +1,400 @@
 """Tests for ShowAds API client."""
 
+import gzip
+from types import SimpleNamespace
+
+import numpy as np
+import orjson
 import pytest
+import requests
 from datetime import datetime, timedelta
 
-from config import Config
-from showads_cli import ShowAdsClient
-from models import BannerRequest
+from showads_cli import POOL_SIZE, ShowAdsClient
+from models import BannerBatch
 
 
 class TestShowAdsClient:
     """Tests for ShowAdsClient class."""
 
+    @pytest.fixture(scope='module')
+    def config(self):
+        """Create a test configuration with only the settings ShowAdsClient reads."""
+        return SimpleNamespace(
+            SHOWADS_API_URL='https://test-api.example.com',
+            PROJECT_KEY='test-project',
+            MAX_RETRIES=3,
+            RETRY_DELAY=1,
+            COMPRESS_REQUESTS=False
+        )
+
+    @pytest.fixture(autouse=True)
+    def post_mock(self, mocker):
+        """Patch Session.post for every test so none can reach the network; tests set its responses."""
+        return mocker.patch('requests.Session.post')
+
+    @pytest.fixture(scope='module')
+    def small_bulk(self):
+        """A two-request batch; the client only reads batches, so tests share it."""
+        return BannerBatch(np.array(['cookie1', 'cookie2'], dtype=object), np.array([1, 2]))
+
+    @pytest.fixture(scope='module')
+    def full_bulk(self):
+        """A batch at the API limit, large enough to be compressed."""
+        return BannerBatch(np.array([f'cookie{i}' for i in range(1000)], dtype=object), np.arange(1000) % 100)
+
+    @pytest.fixture(scope='module')
+    def ok_response(self):
+        """A successful response; the client only reads responses, so tests share them."""
+        return SimpleNamespace(status_code=200, json=lambda: {'AccessToken': 'test-token'}, text='')
+
+    @pytest.fixture(scope='module')
+    def bad_request_response(self):
+        """A 400 response."""
+        return SimpleNamespace(status_code=400, text='Bad Request')
+
+    @pytest.fixture(scope='module')
+    def unauthorized_response(self):
+        """A 401 response for an expired token."""
+        return SimpleNamespace(status_code=401, text='Unauthorized')
+
+    @pytest.fixture(scope='module')
+    def unsupported_response(self):
+        """A 415 response for a server that does not accept gzip bodies."""
+        return SimpleNamespace(status_code=415, text='Unsupported Media Type')
+
+    @pytest.fixture(scope='module')
+    def server_error_response(self):
+        """A 500 response."""
+        return SimpleNamespace(status_code=500, text='Internal Server Error')
+
     @pytest.fixture
-    def config(self, mocker):
-        """Create a test configuration."""
-        config = mocker.Mock(spec=Config)
-        config.SHOWADS_API_URL = 'https://test-api.example.com'
-        config.PROJECT_KEY = 'test-project'
-        config.MAX_RETRIES = 3
-        config.RETRY_DELAY = 1
-        return config
+    def frozen_now(self, mocker):
+        """Freeze the client's clock so token expiry checks are deterministic."""
+        now = datetime(2024, 1, 1, 12, 0, 0)
+        mocker.patch('showads_cli.datetime').now.return_value = now
+        return now
 
     @pytest.fixture
     def client(self, config):
         """Create a ShowAdsClient instance."""
         return ShowAdsClient(config)
 
+    @pytest.fixture
+    def compressing_client(self, config, mocker):
+        """Create a ShowAdsClient with request compression turned on."""
+        client = ShowAdsClient(SimpleNamespace(**{**vars(config), 'COMPRESS_REQUESTS': True}))
+        mocker.patch.object(client, '_ensure_authenticated', return_value=True)
+        return client
+
     def test_init(self, client, config):
         """Test client initialization."""
-        assert client.base_url == config.SHOWADS_API_URL
-        assert client.project_key == config.PROJECT_KEY
-        assert client.access_token is None
-        assert client.token_expires_at is None
+        assert {
+            'base_url': client.base_url,
+            'project_key': client.project_key,
+            'access_token': client.access_token,
+            'token_expires_at': client.token_expires_at,
+        } == {
+            'base_url': config.SHOWADS_API_URL,
+            'project_key': config.PROJECT_KEY,
+            'access_token': None,
+            'token_expires_at': None,
+        }
+
+    def test_init_pools_connections(self, client):
+        """Test that one pooled adapter serves both schemes with a slot per sending thread."""
+        adapter = client.session.get_adapter('https://test-api.example.com')
+
+        assert client.session.get_adapter('http://test-api.example.com') is adapter
+        assert adapter._pool_maxsize == POOL_SIZE
+        assert adapter.max_retries.total == 3
+
+    def test_init_shared_session(self, config, mocker):
+        """Test that an injected session is used as is and left open on close."""
+        session = requests.Session()
+        adapter = session.get_adapter('https://test-api.example.com')
+        mock_close = mocker.patch.object(session, 'close')
+
+        client = ShowAdsClient(config, session=session)
+        client.close()
+
+        assert client.session is session
+        assert session.get_adapter('https://test-api.example.com') is adapter
+        mock_close.assert_not_called()
+
+    def test_shared_session_keeps_token_out_of_headers(self, config, post_mock, small_bulk, ok_response):
+        """Test that authenticating leaves an injected session's headers unchanged and sends the token per request."""
+        session = requests.Session()
+        headers = dict(session.headers)
+        post_mock.return_value = ok_response
+        client = ShowAdsClient(config, session=session)
+
+        assert client.authenticate() is True
+        assert client.send_bulk_banner_requests(small_bulk) is True
+
+        assert dict(session.headers) == headers
+        assert post_mock.call_args.kwargs['headers']['Authorization'] == 'Bearer test-token'
 
     def test_is_token_valid_no_token(self, client):
         """Test token validation when no token exists."""
         assert not client._is_token_valid()
 
-    def test_is_token_valid_expired_token(self, client):
+    def test_is_token_valid_expired_token(self, client, frozen_now):
         """Test token validation when token is expired."""
         client.access_token = 'test-token'
-        client.token_expires_at = datetime.now() - timedelta(hours=1)
+        client.token_expires_at = frozen_now - timedelta(hours=1)
         assert not client._is_token_valid()
 
-    def test_is_token_valid_valid_token(self, client):
+    def test_is_token_valid_expiring_within_buffer(self, client, frozen_now):
+        """Test that a token about to expire is renewed ahead of time."""
+        client.access_token = 'test-token'
+        client.token_expires_at = frozen_now + timedelta(seconds=30)
+        assert not client._is_token_valid()
+
+    def test_is_token_valid_valid_token(self, client, frozen_now):
         """Test token validation when token is valid."""
         client.access_token = 'test-token'
-        client.token_expires_at = datetime.now() + timedelta(hours=1)
+        client.token_expires_at = frozen_now + timedelta(hours=1)
         assert client._is_token_valid()
 
-    def test_authenticate_success(self, mocker, client):
-        """Test successful authentication."""
-        mock_response = mocker.Mock()
-        mock_response.status_code = 200
-        mock_response.json.return_value = {'AccessToken': 'test-token'}
-        mock_post = mocker.patch('requests.Session.post', return_value=mock_response)
-
-        result = client.authenticate()
-
-        assert result is True
-        assert client.access_token == 'test-token'
-        assert client.token_expires_at is not None
-        mock_post.assert_called_once()
-
-    def test_authenticate_failure(self, mocker, client):
-        """Test failed authentication."""
-        mock_response = mocker.Mock()
-        mock_response.status_code = 400
-        mock_response.text = 'Bad Request'
-        mock_post = mocker.patch('requests.Session.post', return_value=mock_response)
-
-        result = client.authenticate()
-
-        assert result is False
-        assert client.access_token is None
-        assert client.token_expires_at is None
-
-    def test_authenticate_exception(self, mocker, client):
-        """Test authentication with exception."""
-        mock_post = mocker.patch('requests.Session.post', side_effect=Exception('Network error'))
+    @pytest.mark.parametrize('response,error,expected,token', [
+        ('ok_response', None, True, 'test-token'),
+        ('bad_request_response', None, False, None),
+        (None, Exception('Network error'), False, None),
+    ])
+    def test_authenticate(self, request, client, post_mock, frozen_now, response, error, expected, token):
+        """Test authentication on success, on an error response and on a network failure."""
+        if error is not None:
+            post_mock.side_effect = error
+        else:
+            post_mock.return_value = request.getfixturevalue(response)
 
         result = client.authenticate()
 
-        assert result is False
-        assert client.access_token is None
-
-    def test_send_banner_request_success(self, mocker, client):
+        assert {
+            'result': result,
+            'access_token': client.access_token,
+            'token_expires_at': client.token_expires_at,
+            'authorization': client.session.headers.get('Authorization'),
+        } == {
+            'result': expected,
+            'access_token': token,
+            'token_expires_at': frozen_now + timedelta(hours=24) if expected else None,
+            'authorization': f'Bearer {token}' if token else None,
+        }
+        post_mock.assert_called_once()
+
+    def test_send_banner_request_success(self, mocker, client, post_mock, ok_response):
         """Test successful banner request."""
         mock_auth = mocker.patch.object(client, '_ensure_authenticated', return_value=True)
-        mock_response = mocker.Mock()
-        mock_response.status_code = 200
-        mock_post = mocker.patch('requests.Session.post', return_value=mock_response)
+        post_mock.return_value = ok_response
         client.access_token = 'test-token'
 
         result = client.send_banner_request('test-cookie', 42)
 
         assert result is True
-        mock_post.assert_called_once()
+        post_mock.assert_called_once()
+        assert orjson.loads(post_mock.call_args.kwargs['data']) == {'VisitorCookie': 'test-cookie', 'BannerId': 42}
+        assert post_mock.call_args.kwargs['headers']['Content-Type'] == 'application/json'
 
-    def test_send_banner_request_auth_failure(self, mocker, client):
+    def test_send_banner_request_auth_failure(self, mocker, client, post_mock):
         """Test banner request with authentication failure."""
         mock_auth = mocker.patch.object(client, '_ensure_authenticated', return_value=False)
 
         result = client.send_banner_request('test-cookie', 42)
 
         assert result is False
+        post_mock.assert_not_called()
 
-    def test_send_banner_request_api_error(self, mocker, client):
+    def test_send_banner_request_api_error(self, mocker, client, post_mock, server_error_response):
         """Test banner request with API error."""
         mock_auth = mocker.patch.object(client, '_ensure_authenticated', return_value=True)
-        mock_response = mocker.Mock()
-        mock_response.status_code = 500
-        mock_response.text = 'Internal Server Error'
-        mock_post = mocker.patch('requests.Session.post', return_value=mock_response)
+        post_mock.return_value = server_error_response
         client.access_token = 'test-token'
 
         result = client.send_banner_request('test-cookie', 42)
 
         assert result is False
 
-    def test_send_banner_request_token_expired(self, mocker, client):
+    def test_send_banner_request_token_expired(self, mocker, client, post_mock, ok_response, unauthorized_response):
         """Test banner request with token expiration and re-authentication."""
         mock_auth = mocker.patch.object(client, '_ensure_authenticated', return_value=True)
         mock_reauth = mocker.patch.object(client, 'authenticate', return_value=True)
 
         # First call returns 401 (token expired), second call succeeds
-        mock_response_401 = mocker.Mock()
-        mock_response_401.status_code = 401
-        mock_response_200 = mocker.Mock()
-        mock_response_200.status_code = 200
-        mock_post = mocker.patch('requests.Session.post', side_effect=[mock_response_401, mock_response_200])
+        post_mock.side_effect = [unauthorized_response, ok_response]
 
         client.access_token = 'test-token'
 
         result = client.send_banner_request('test-cookie', 42)
 
         assert result is True
-        assert mock_post.call_count == 2
+        assert post_mock.call_count == 2
         mock_reauth.assert_called_once()
 
-    def test_send_bulk_banner_requests_success(self, mocker, client):
+    def test_send_bulk_banner_requests_success(self, mocker, client, post_mock, small_bulk, ok_response):
         """Test successful bulk banner requests."""
         mock_auth = mocker.patch.object(client, '_ensure_authenticated', return_value=True)
-        mock_response = mocker.Mock()
-        mock_response.status_code = 200
-        mock_post = mocker.patch('requests.Session.post', return_value=mock_response)
+        post_mock.return_value = ok_response
         client.access_token = 'test-token'
 
-        banner_requests = [
-            BannerRequest(VisitorCookie='cookie1', BannerId=1),
-            BannerRequest(VisitorCookie='cookie2', BannerId=2)
-        ]
+        result = client.send_bulk_banner_requests(small_bulk)
 
-        result = client.send_bulk_banner_requests(banner_requests)
+        assert result is True
+        post_mock.assert_called_once()
+        assert orjson.loads(post_mock.call_args.kwargs['data']) == {'Data': [
+            {'VisitorCookie': 'cookie1', 'BannerId': 1},
+            {'VisitorCookie': 'cookie2', 'BannerId': 2}
+        ]}
+        assert post_mock.call_args.kwargs['headers']['Content-Type'] == 'application/json'
+        # Small payloads are not worth compressing
+        assert 'Content-Encoding' not in post_mock.call_args.kwargs['headers']
+
+    def test_send_bulk_banner_requests_uncompressed_by_default(self, mocker, client, post_mock, full_bulk,
+                                                              ok_response):
+        """Test that large bulk payloads are sent as plain JSON unless compression is turned on."""
+        mocker.patch.object(client, '_ensure_authenticated', return_value=True)
+        post_mock.return_value = ok_response
+
+        assert client.send_bulk_banner_requests(full_bulk) is True
+
+        post_mock.assert_called_once()
+        assert 'Content-Encoding' not in post_mock.call_args.kwargs['headers']
+        assert orjson.loads(post_mock.call_args.kwargs['data'])['Data'] == full_bulk.to_records()
+
+    def test_send_bulk_banner_requests_compresses_large_payload(self, compressing_client, post_mock, full_bulk,
+                                                               ok_response):
+        """Test that large bulk payloads are sent gzip-compressed when compression is turned on."""
+        client = compressing_client
+        post_mock.return_value = ok_response
+
+        result = client.send_bulk_banner_requests(full_bulk)
 
         assert result is True
-        mock_post.assert_called_once()
+        post_mock.assert_called_once()
+        assert post_mock.call_args.kwargs['headers']['Content-Encoding'] == 'gzip'
+        payload = orjson.loads(gzip.decompress(post_mock.call_args.kwargs['data']))
+        assert payload['Data'] == full_bulk.to_records()
+
+    @pytest.mark.parametrize('rejection', ['bad_request_response', 'unsupported_response'])
+    def test_send_bulk_banner_requests_compression_unsupported(self, request, compressing_client, post_mock,
+                                                               full_bulk, ok_response, rejection):
+        """Test fallback to an uncompressed body when the server rejects the first compressed one."""
+        client = compressing_client
+        post_mock.side_effect = [request.getfixturevalue(rejection), ok_response, ok_response]
+
+        assert client.send_bulk_banner_requests(full_bulk) is True
+        assert client.send_bulk_banner_requests(full_bulk) is True
+
+        assert post_mock.call_count == 3
+        retried, later = post_mock.call_args_list[1:]
+        assert 'Content-Encoding' not in retried.kwargs['headers']
+        assert orjson.loads(retried.kwargs['data'])['Data'] == full_bulk.to_records()
+        # Compression stays off once the server has rejected it
+        assert 'Content-Encoding' not in later.kwargs['headers']
+
+    def test_send_bulk_banner_requests_bad_request_after_compression_accepted(self, compressing_client, post_mock,
+                                                                              full_bulk, ok_response,
+                                                                              bad_request_response):
+        """Test that a 400 is not taken for missing gzip support once a compressed body got through."""
+        client = compressing_client
+        post_mock.side_effect = [ok_response, bad_request_response, ok_response]
+
+        assert client.send_bulk_banner_requests(full_bulk) is True
+        assert client.send_bulk_banner_requests(full_bulk) is False
+        assert client.send_bulk_banner_requests(full_bulk) is True
+
+        assert all(call.kwargs['headers']['Content-Encoding'] == 'gzip' for call in post_mock.call_args_list)
+
+    def test_send_bulk_banner_requests_token_expired(self, mocker, client, post_mock, small_bulk,
+                                                     ok_response, unauthorized_response):
+        """Test that a bulk request is resent with the same body after re-authentication."""
+        mocker.patch.object(client, '_ensure_authenticated', return_value=True)
+        mock_reauth = mocker.patch.object(client, 'authenticate', return_value=True)
+        post_mock.side_effect = [unauthorized_response, ok_response]
+        mock_dumps = mocker.spy(orjson, 'dumps')
 
-    def test_send_bulk_banner_requests_empty_list(self, mocker, client):
+        result = client.send_bulk_banner_requests(small_bulk)
+
+        assert result is True
+        mock_reauth.assert_called_once()
+        mock_dumps.assert_called_once()
+        first, retry = post_mock.call_args_list
+        assert retry.kwargs['data'] is first.kwargs['data']
+
+    def test_send_bulk_banner_requests_token_expired_twice(self, mocker, client, post_mock, small_bulk,
+                                                           unauthorized_response):
+        """Test that a bulk request is retried only once after re-authentication."""
+        mocker.patch.object(client, '_ensure_authenticated', return_value=True)
+        mocker.patch.object(client, 'authenticate', return_value=True)
+        post_mock.return_value = unauthorized_response
+
+        result = client.send_bulk_banner_requests(small_bulk)
+
+        assert result is False
+        assert post_mock.call_count == 2
+
+    def test_send_bulk_banner_requests_token_renewed_by_other_thread(self, mocker, client, post_mock, small_bulk,
+                                                                     frozen_now, ok_response, unauthorized_response):
+        """Test that a 401 does not renew a token another sending thread has already replaced."""
+        mocker.patch.object(client, '_ensure_authenticated', return_value=True)
+        mock_reauth = mocker.patch.object(client, 'authenticate', return_value=True)
+        client.access_token = 'old-token'
+
+        responses = iter([unauthorized_response, ok_response])
+
+        def renewed_elsewhere(*args, **kwargs):
+            # Another thread renews the token while this request is in flight
+            client.access_token = 'new-token'
+            client.token_expires_at = frozen_now + timedelta(hours=24)
+            return next(responses)
+
+        post_mock.side_effect = renewed_elsewhere
+
+        assert client.send_bulk_banner_requests(small_bulk) is True
+        assert post_mock.call_count == 2
+        mock_reauth.assert_not_called()
+
+    def test_send_bulk_banner_requests_token_expired_waits_for_lock(self, mocker, client, post_mock, small_bulk,
+                                                                    unauthorized_response):
+        """Test that renewing after a 401 takes the same lock as the regular token check."""
+        mocker.patch.object(client, '_ensure_authenticated', return_value=True)
+        lock_held = []
+        mocker.patch.object(client, 'authenticate', side_effect=lambda: lock_held.append(client._auth_lock.locked()))
+        post_mock.return_value = unauthorized_response
+
+        client.send_bulk_banner_requests(small_bulk)
+
+        assert lock_held == [True]
+
+    def test_send_bulk_banner_requests_empty_list(self, mocker, client, post_mock):
         """Test bulk banner requests with empty list."""
         mock_auth = mocker.patch.object(client, '_ensure_authenticated', return_value=True)
 
-        result = client.send_bulk_banner_requests([])
+        result = client.send_bulk_banner_requests(BannerBatch(np.array([], dtype=object), np.array([])))
 
         assert result is True
+        post_mock.assert_not_called()
 
-    def test_send_bulk_banner_requests_too_many(self, mocker, client):
-        """Test bulk banner requests with too many requests."""
-        mock_auth = mocker.patch.object(client, '_ensure_authenticated', return_value=True)
+    @pytest.mark.parametrize('size,expected', [(2, True), (3, False)])
+    def test_send_bulk_banner_requests_size_limit(self, mocker, client, post_mock, size, expected, ok_response):
+        """Test that batches up to the bulk limit are sent and larger ones are rejected unsent."""
+        mocker.patch.object(client, '_ensure_authenticated', return_value=True)
+        # A tiny limit exercises the same guard as the real 1000 without building large batches
+        mocker.patch('showads_cli.MAX_BULK_SIZE', 2)
+        post_mock.return_value = ok_response
 
-        # Create 1001 requests (exceeding limit of 1000)
-        banner_requests = [
-            BannerRequest(VisitorCookie=f'cookie{i}', BannerId=i % 100)
-            for i in range(1001)
-        ]
+        banner_requests = BannerBatch(np.array([f'cookie{i}' for i in range(size)], dtype=object), np.arange(size))
 
         result = client.send_bulk_banner_requests(banner_requests)
 
-        assert result is False
+        assert result is expected
+        assert post_mock.call_count == int(expected)
 
-    def test_send_bulk_banner_requests_auth_failure(self, mocker, client):
+    def test_send_bulk_banner_requests_auth_failure(self, mocker, client, post_mock, small_bulk):
         """Test bulk banner requests with authentication failure."""
         mock_auth = mocker.patch.object(client, '_ensure_authenticated', return_value=False)
 
-        banner_requests = [
-            BannerRequest(VisitorCookie='cookie1', BannerId=1)
-        ]
-
-        result = client.send_bulk_banner_requests(banner_requests)
+        result = client.send_bulk_banner_requests(small_bulk)
 
         assert result is False
+        post_mock.assert_not_called()